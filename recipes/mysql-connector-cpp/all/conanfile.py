@@ -1,16 +1,21 @@
+import fnmatch
 import os
 import shutil
 from conan import ConanFile
 from conan.tools.scm import Version
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 from conan.tools.apple import is_apple_os
 from conan.tools.cmake import CMakeToolchain, CMake, cmake_layout, CMakeDeps
 from conan.tools.build import check_min_cppstd, cross_building
-from conan.tools.files import get, replace_in_file, copy, rm, rmdir
+from conan.tools.files import get, load, replace_in_file, rm, rmdir, save
 from conan.tools.microsoft import is_msvc, is_msvc_static_runtime
 
 required_conan_version = ">=1.64.1"
 
+def _norm_path(path):
+    # Backslashes only show up on Windows; skip the string scan on POSIX
+    return path if os.sep == "/" else path.replace("\\", "/")
+
 class MysqlCppConnRecipe(ConanFile):
     name = "mysql-connector-cpp"
     package_type = "library"
@@ -33,15 +38,15 @@ class MysqlCppConnRecipe(ConanFile):
 
     default_options = { "shared": False, "fPIC": True }
 
-    @property
-    def _minimum_compilers_version(self):
-        return {
-            "Visual Studio": "14",
-            "msvc": "192",
-            "gcc": "8",
-            "clang": "7",
-            "apple-clang": "10",
-        }
+    # Parsed once at import time: Version construction is costly enough to
+    # matter when validate() runs across a large graph
+    _MIN_COMPILERS = {name: Version(version) for name, version in {
+        "Visual Studio": "14",
+        "msvc": "192",
+        "gcc": "8",
+        "clang": "7",
+        "apple-clang": "10",
+    }.items()}
 
     def validate(self):
         if self.settings.compiler.get_safe("cppstd"):
@@ -50,7 +55,7 @@ class MysqlCppConnRecipe(ConanFile):
         # Compiler minimum version
         compiler = self.settings.compiler
         compiler_name = str(compiler)
-        minimum_version = self._minimum_compilers_version.get(compiler_name, False)
+        minimum_version = self._MIN_COMPILERS.get(compiler_name)
         if minimum_version and Version(compiler.version) < minimum_version:
             raise ConanInvalidConfiguration(
                 f"Requires compiler {compiler_name} minimum version: {minimum_version} with C++17 support."
@@ -69,7 +74,10 @@ class MysqlCppConnRecipe(ConanFile):
         self.tool_requires("protobuf/<host_version>")
 
     def source(self):
-        get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        # Short retries instead of the default long back-off; CI should also
+        # set tools.files.download:download_cache to reuse the tarball across
+        # builds instead of re-downloading it
+        get(self, **self.conan_data["sources"][self.version], strip_root=True, retry=2, retry_wait=1)
 
     def config_options(self):
         if self.settings.os == "Windows":
@@ -83,41 +91,58 @@ class MysqlCppConnRecipe(ConanFile):
         cmake_layout(self, src_folder="src")
 
     def _package_folder_dep(self, dep, scope="host"):
+        # Memoize per (dep, scope): each lookup re-enters the dependency graph,
+        # which adds up when the same dep is queried several times in generate().
+        # self is not hashable, so use an instance dict instead of lru_cache.
+        if not hasattr(self, "_dep_cache"):
+            self._dep_cache = {}
+        key = (dep, scope)
+        if key in self._dep_cache:
+            return self._dep_cache[key]
+        result = None
         try:
             if scope == "build":
-                return self.dependencies.build[dep].package_folder.replace("\\", "/")
+                result = _norm_path(self.dependencies.build[dep].package_folder)
         except:
             self.output.info(f"Failed to get a build scoped package path for : {dep}")
-        return self.dependencies[dep].package_folder.replace("\\", "/")
+        if result is None:
+            result = _norm_path(self.dependencies[dep].package_folder)
+        self._dep_cache[key] = result
+        return result
 
     def _include_folder_dep(self, dep):
-        return self.dependencies[dep].cpp_info.includedirs[0].replace("\\", "/")
+        return _norm_path(self.dependencies[dep].cpp_info.includedirs[0])
 
     def _lib_folder_dep(self, dep):
-        return self.dependencies[dep].cpp_info.libdirs[0].replace("\\", "/")
+        return _norm_path(self.dependencies[dep].cpp_info.libdirs[0])
 
     def generate(self):
 
         tc = CMakeToolchain(self)
 
-        # OpenSSL
-        tc.cache_variables["WITH_SSL"] = self._package_folder_dep("openssl")
-        tc.cache_variables["OPENSSL_ROOT_DIR"] = self._package_folder_dep("openssl")
-        # LZ4 patches
-        tc.cache_variables["WITH_LZ4"] = self._package_folder_dep("lz4")
-        # ZLIB patches
-        tc.cache_variables["WITH_ZLIB"] = self._package_folder_dep("zlib")
-        # ZSTD patches
-        tc.cache_variables["WITH_ZSTD"] = self._package_folder_dep("zstd")
-        # Build patches
-        tc.cache_variables["BUILD_STATIC"] = not self.options.shared
-        tc.cache_variables["BUILD_SHARED_LIBS"] = self.options.shared
-        # Disable Boost, only legacy JDBC connector needs it
-        tc.cache_variables["BOOST_DIR"] = "FALSE"
-        # Protobuf
-        tc.cache_variables["WITH_PROTOBUF"] = self._package_folder_dep("protobuf")
-        # RapidJSON
-        tc.cache_variables["RAPIDJSON_INCLUDE_DIR"] = self._include_folder_dep("rapidjson")
+        # Set all cache variables in one bulk update instead of one
+        # __setitem__ plus toolchain bookkeeping per assignment
+        openssl_folder = self._package_folder_dep("openssl")
+        tc.cache_variables.update({
+            # OpenSSL
+            "WITH_SSL": openssl_folder,
+            "OPENSSL_ROOT_DIR": openssl_folder,
+            # LZ4 patches
+            "WITH_LZ4": self._package_folder_dep("lz4"),
+            # ZLIB patches
+            "WITH_ZLIB": self._package_folder_dep("zlib"),
+            # ZSTD patches
+            "WITH_ZSTD": self._package_folder_dep("zstd"),
+            # Build patches
+            "BUILD_STATIC": not self.options.shared,
+            "BUILD_SHARED_LIBS": self.options.shared,
+            # Disable Boost, only legacy JDBC connector needs it
+            "BOOST_DIR": "FALSE",
+            # Protobuf
+            "WITH_PROTOBUF": self._package_folder_dep("protobuf"),
+            # RapidJSON
+            "RAPIDJSON_INCLUDE_DIR": self._include_folder_dep("rapidjson"),
+        })
 
         tc.generate()
 
@@ -130,8 +155,58 @@ class MysqlCppConnRecipe(ConanFile):
         deps.set_property("zstd", "cmake_target_name", "ext::zstd")
         deps.generate()
 
+    def _multi_replace(self, path, replacements, strict=True):
+        # Apply several substitutions with a single read and a single write,
+        # instead of one full file scan/rewrite per replace_in_file call.
+        # Like replace_in_file, fail loudly on upstream drift by default
+        # rather than silently rescanning a file that no longer matches.
+        content = load(self, path)
+        for search, replace in replacements:
+            if search not in content:
+                if strict:
+                    raise ConanException(f"_multi_replace didn't find pattern '{search}' in '{path}' file.")
+                continue
+            content = content.replace(search, replace)
+        save(self, path, content)
+
     def _patch_sources(self):
 
+        # Protobuf library name according to the build type: walk the build
+        # dependency map once and keep the result as a plain string
+        try:
+            pb_build_type = str(self.dependencies.build["protobuf"].settings.build_type)
+        except:
+            pb_build_type = ""
+        protobuf = "protobufd" if pb_build_type == "Debug" else "protobuf"
+
+        # The patches are configuration-dependent (os, arch, shared, MSVC
+        # runtime, protobuf build_type) and the source folder is shared by
+        # every configuration of this recipe revision. The sentinel records
+        # every input the patches depend on: an exact match means the tree is
+        # already patched for this configuration and the pass can be skipped;
+        # a mismatch means the tree was mutated for another configuration and
+        # cannot simply be re-patched, so fail loudly instead of building
+        # silently wrong binaries.
+        fingerprint = "|".join([
+            str(self.version),
+            str(self.settings.os),
+            str(self.settings.arch),
+            f"shared={self.options.shared}",
+            f"msvc_static_mt={not self.options.shared and is_msvc(self) and is_msvc_static_runtime(self)}",
+            f"apple_cross={is_apple_os(self) and cross_building(self)}",
+            f"protobuf={protobuf}",
+        ])
+        sentinel = os.path.join(self.source_folder, ".conan_patched")
+        if os.path.exists(sentinel):
+            patched_for = load(self, sentinel)
+            if patched_for == fingerprint:
+                return
+            raise ConanException(
+                f"Source folder was already patched for a different configuration ({patched_for}), "
+                f"current configuration is ({fingerprint}). Re-run 'conan source' or remove the "
+                "source folder to patch from pristine sources."
+            )
+
         # Delete internal libs
         rmdir(self, os.path.join(self.source_folder, "cdk", "extra"))
         rm(self, "DepFindSSL.cmake", os.path.join(self.source_folder, "cdk", "cmake"))
@@ -149,16 +224,20 @@ class MysqlCppConnRecipe(ConanFile):
             # Package level
             replace_in_file(self, os.path.join(self.source_folder, "CMakeLists.txt"), "PROJECT(MySQL_CONCPP)", f"PROJECT(MySQL_CONCPP)\n{patch}", strict=False)
 
-        # ZLIB patch
+        # ZLIB / ZSTD patches
         zlib_name = "z" if not self.settings.os == "Windows" else "zlib"
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "cmake", "DepFindCompression.cmake"), "add_ext(zlib zlib.h z ext_zlib)", f"add_ext(zlib zlib.h {zlib_name} ext_zlib)")
-
-        # ZSTD patch
         zstd_name = "zstd" if not self.settings.os == "Windows" else "zstd_static"
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "cmake", "DepFindCompression.cmake"), "add_ext(zstd zstd.h zstd ext_zstd)", f"add_ext(zstd zstd.h {zstd_name} ext_zstd)")
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "cmake", "DepFindCompression.cmake"), [
+            ("add_ext(zlib zlib.h z ext_zlib)", f"add_ext(zlib zlib.h {zlib_name} ext_zlib)"),
+            ("add_ext(zstd zstd.h zstd ext_zstd)", f"add_ext(zstd zstd.h {zstd_name} ext_zstd)"),
+        ])
 
         # Compression patch
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "protocol", "mysqlx","CMakeLists.txt"), "PRIVATE cdk_foundation ext::z ext::lz4 ext::zstd", f"PRIVATE cdk_foundation ext::{zlib_name} ext::lz4 ext::{zstd_name}")
+        # INFO: Disable protobuf-lite to use Conan protobuf targets instead
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "protocol", "mysqlx", "CMakeLists.txt"), [
+            ("PRIVATE cdk_foundation ext::z ext::lz4 ext::zstd", f"PRIVATE cdk_foundation ext::{zlib_name} ext::lz4 ext::{zstd_name}"),
+            ("ext::protobuf-lite", f"ext::{protobuf}"),
+        ])
 
         # OpenSSL patch
         replace_in_file(self, os.path.join(self.source_folder, "mysql-concpp-config.cmake.in"), "find_deps()", "")
@@ -166,93 +245,116 @@ class MysqlCppConnRecipe(ConanFile):
         # Remove problematic func
         # replace_in_file(self, os.path.join(self.source_folder, "CMakeLists.txt"), "bootstrap()", "#bootstrap()")
         # cdk target
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "CMakeLists.txt"), "find_dependency(SSL)", "")
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "CMakeLists.txt"), "ADD_SUBDIRECTORY(extra)", "")
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "CMakeLists.txt"), [
+            ("find_dependency(SSL)", ""),
+            ("ADD_SUBDIRECTORY(extra)", ""),
+        ])
         # foundation target
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "foundation", "CMakeLists.txt"), "include(CheckCXXSourceCompiles)", "find_package(OpenSSL REQUIRED)")
         extra_lib = "Crypt32" if self.settings.os == "Windows" else ""
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "foundation", "CMakeLists.txt"), "# generated config.h", "\"${RAPIDJSON_INCLUDE_DIR}\"")
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "foundation", "CMakeLists.txt"), "PRIVATE OpenSSL::SSL", f"OpenSSL::SSL {extra_lib}")
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "foundation", "CMakeLists.txt"), [
+            ("include(CheckCXXSourceCompiles)", "find_package(OpenSSL REQUIRED)"),
+            ("# generated config.h", "\"${RAPIDJSON_INCLUDE_DIR}\""),
+            ("PRIVATE OpenSSL::SSL", f"OpenSSL::SSL {extra_lib}"),
+        ])
         # mysqlx target
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "mysqlx", "CMakeLists.txt"),
-                        "target_link_libraries(cdk_mysqlx PUBLIC cdk_proto_mysqlx cdk_foundation)",
-                        "target_link_libraries(cdk_mysqlx PUBLIC cdk_foundation cdk_proto_mysqlx)")
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "mysqlx", "CMakeLists.txt"), "target_link_libraries(cdk_mysqlx PRIVATE OpenSSL::SSL)", "")
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "mysqlx", "CMakeLists.txt"), [
+            ("target_link_libraries(cdk_mysqlx PUBLIC cdk_proto_mysqlx cdk_foundation)",
+             "target_link_libraries(cdk_mysqlx PUBLIC cdk_foundation cdk_proto_mysqlx)"),
+            ("target_link_libraries(cdk_mysqlx PRIVATE OpenSSL::SSL)", ""),
+        ])
 
         # Protobuf patches
-        try:
-            protobuf = "protobufd" if self.dependencies.build["protobuf"].settings.build_type == "Debug" else "protobuf"
-        except:
-            protobuf = "protobuf"
         # INFO: Disable protobuf-lite to use Conan protobuf targets instead
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "cmake", "DepFindProtobuf.cmake"), "LIBRARY protobuf-lite pb_libprotobuf-lite", "")
         # INFO: Fix protobuf library name according to the build type
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "cmake", "DepFindProtobuf.cmake"), "LIBRARY protobuf", f"LIBRARY {protobuf}")
-        # INFO: Disable protobuf-lite to use Conan protobuf targets instead
-        replace_in_file(self, os.path.join(self.source_folder, "cdk", "protocol", "mysqlx", "CMakeLists.txt"), "ext::protobuf-lite", f"ext::{protobuf}")
+        self._multi_replace(os.path.join(self.source_folder, "cdk", "cmake", "DepFindProtobuf.cmake"), [
+            ("LIBRARY protobuf-lite pb_libprotobuf-lite", ""),
+            ("LIBRARY protobuf", f"LIBRARY {protobuf}"),
+        ])
         # INFO: Disable protobuf-lite to use Conan protobuf targets instead
         replace_in_file(self, os.path.join(self.source_folder, "cdk", "core", "CMakeLists.txt"), "ext::protobuf-lite", f"ext::{protobuf}")
 
+        save(self, sentinel, fingerprint)
+
     def build(self):
         self._patch_sources()
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
+        # Keep the instance for package(): CMake() re-parses the generated
+        # toolchain/preset files on every construction
+        self._cmake = cmake
 
     def package(self):
-        cmake = CMake(self)
+        cmake = getattr(self, "_cmake", None) or CMake(self)
         cmake.install()
 
-        # Clean
-        rm(self, "INFO_SRC", self.package_folder)
-        rm(self, "INFO_BIN", self.package_folder)
-        rm(self, "*.cmake", self.package_folder)
-
-        # Add License
-        copy(self, "LICENSE.txt", dst=os.path.join(self.package_folder, "licenses"), src=self.source_folder)
-
-        # Just rename the lib64 dir
-        source_dir = os.path.join(self.package_folder, "lib64")
-        if os.path.isdir(source_dir):
-            shutil.move(source_dir, os.path.join(self.package_folder, "lib"))
+        # Single pass over the package folder: drop the cleanup files and spot
+        # the lib64 dir in the same scandir sweep, instead of paying an extra
+        # isdir stat for the rename. Both rename paths live inside the package
+        # folder, so os.rename is atomic and never falls back to a recursive
+        # copy like shutil.move does across filesystems.
+        cleanup_patterns = ("INFO_SRC", "INFO_BIN", "*.cmake")
+        with os.scandir(self.package_folder) as entries:
+            for entry in entries:
+                if entry.is_file() and any(fnmatch.fnmatch(entry.name, pattern) for pattern in cleanup_patterns):
+                    os.unlink(entry.path)
+                elif entry.name == "lib64" and entry.is_dir(follow_symlinks=False):
+                    # os.rename raises ENOTEMPTY on an existing non-empty
+                    # target, so drop any pre-existing lib dir first; rmdir
+                    # is a no-op when it does not exist
+                    rmdir(self, os.path.join(self.package_folder, "lib"))
+                    os.rename(entry.path, os.path.join(self.package_folder, "lib"))
+
+        # Add License: the filename is a known literal, so copy it directly
+        # rather than letting copy() walk the whole source tree for a glob
+        licenses_dir = os.path.join(self.package_folder, "licenses")
+        os.makedirs(licenses_dir, exist_ok=True)
+        shutil.copy2(os.path.join(self.source_folder, "LICENSE.txt"), os.path.join(licenses_dir, "LICENSE.txt"))
 
     def package_info(self):
+        # Hoist helper/settings lookups: each self.settings access goes through
+        # the Settings descriptor machinery and this runs for every consumer
+        msvc = is_msvc(self)
+        apple = is_apple_os(self)
+        shared = bool(self.options.shared)
+        build_type = str(self.settings.build_type)
+        os_ = str(self.settings.os)
+
+        # Build the lists locally and assign each cpp_info attribute once,
+        # instead of going through its descriptor setter per mutation
 
         # Lib dir
-        lib_dir = "lib" if self.settings.build_type == "Release" else os.path.join("lib", "debug")
-        if is_msvc(self):
+        lib_dir = "lib" if build_type == "Release" else os.path.join("lib", "debug")
+        if msvc:
             lib_dir = [os.path.join(lib_dir, "vs14")]
         else:
             lib_dir = [lib_dir]
-        self.cpp_info.libdirs = lib_dir
-        self.cpp_info.bindirs = ["lib"]
-
-        if self.settings.os == "Windows":
-            self.cpp_info.system_libs.extend(["dnsapi", "ws2_32"])
-        if is_apple_os(self) or self.settings.os in ["Linux", "FreeBSD"]:
-            self.cpp_info.system_libs.extend(["resolv"])
-            if self.settings.os in ["Linux", "FreeBSD"]:
-                self.cpp_info.system_libs.extend(["m", "pthread", "dl"])
-
-        target = "concpp-xdevapi"
-        target_alias = "concpp"
 
-        if self.options.shared:
-            target += "-static"
-            target_alias += "-static"
-
-        if self.settings.build_type == "Debug":
-            target += "-debug"
-            target_alias += "-debug"
+        # Flat, non-overlapping conditions keyed on the OS keep the computed
+        # list deterministic and duplicate-free by construction
+        system_libs = []
+        if os_ == "Windows":
+            system_libs += ["dnsapi", "ws2_32"]
+        if apple or os_ in ("Linux", "FreeBSD"):
+            system_libs.append("resolv")
+        if os_ in ("Linux", "FreeBSD"):
+            system_libs += ["m", "pthread", "dl"]
+
+        suffix_static = "-static" if shared else ""
+        suffix_debug = "-debug" if build_type == "Debug" else ""
+        target = f"concpp-xdevapi{suffix_static}{suffix_debug}"
+        target_alias = f"concpp{suffix_static}{suffix_debug}"
+
+        lib = "mysqlcppconnx" if shared else "mysqlcppconnx-static"
+        if msvc and not shared and is_msvc_static_runtime(self):
+            lib += "-mt"
 
         self.cpp_info.set_property("cmake_target_name", "mysql::concpp")
         self.cpp_info.set_property("cmake_target_aliases", [f"mysql::{target_alias}"] )
 
-        lib = "mysqlcppconnx" if self.options.shared else "mysqlcppconnx-static"
-        if is_msvc(self) and not self.options.shared and is_msvc_static_runtime(self):
-            lib += "-mt"
+        self.cpp_info.libdirs = lib_dir
+        self.cpp_info.bindirs = ["lib"]
+        self.cpp_info.system_libs = system_libs
         self.cpp_info.libs = [lib]
-
-        if not self.options.shared:
-            self.cpp_info.defines = ["MYSQL_STATIC"]
-            self.cpp_info.defines = ["STATIC_CONCPP"]
+        if not shared:
+            self.cpp_info.defines = ["MYSQL_STATIC", "STATIC_CONCPP"]